@@ -0,0 +1,81 @@
+# MIT License
+
+# Copyright (c) 2023 Voxed Team
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Cold-start budget check: imports function_app in a fresh interpreter with
+# -X importtime and fails if it is too slow or pulls in the heavy codecs.
+#
+# Usage: python benchmarks/import_time.py [budget_ms]
+
+import os
+import subprocess
+import sys
+
+IMPORT_TIME_BUDGET_MS = 500
+HEAVY_MODULES = ["cv2", "numpy", "PIL", "xed_reader"]
+
+
+def measure_import_time(module="function_app"):
+    project_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    # Also report which heavy modules ended up loaded
+    code = (f"import sys, {module}\n"
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=project_path, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"ERROR: Could not import {module}\n{result.stderr}")
+
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            cumulative_us = int(fields[1])
+
+    if cumulative_us is None:
+        raise Exception(f"ERROR: No import time reported for {module}")
+
+    loaded = [m for m in result.stdout.strip().split(",") if m != ""]
+    return cumulative_us / 1000, loaded
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else IMPORT_TIME_BUDGET_MS
+    elapsed_ms, loaded = measure_import_time()
+
+    print(f"IMPORT TIME: {elapsed_ms:.1f} ms (budget {budget_ms:.1f} ms)")
+    if loaded:
+        print(f"HEAVY MODULES LOADED: {', '.join(loaded)}")
+
+    if elapsed_ms > budget_ms or loaded:
+        print("FAIL")
+        sys.exit(1)
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
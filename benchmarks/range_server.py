@@ -0,0 +1,117 @@
+# MIT License
+
+# Copyright (c) 2023 Voxed Team
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Local stand-in for blob storage: serves a directory over HTTP with single
+# Range support and counts requests and bytes sent, so remote decodes can be
+# measured without a storage account.
+#
+# Usage: python benchmarks/range_server.py [directory] [port]
+
+import os
+import re
+import sys
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+RANGE_PATTERN = re.compile(r"bytes=(\d+)-(\d*)$")
+
+
+class range_request_handler(SimpleHTTPRequestHandler):
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404, "File not found")
+            return None
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        status = 200
+
+        match = RANGE_PATTERN.match(self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            if match.group(2) != "":
+                end = min(int(match.group(2)), size - 1)
+            if start > end:
+                self.send_error(416, "Requested range not satisfiable")
+                return None
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+
+        with self.server.lock:
+            self.server.requests += 1
+        self.range = (start, end - start + 1)
+        return open(path, 'rb')
+
+    def copyfile(self, source, outputfile):
+        start, length = self.range
+        source.seek(start)
+        outputfile.write(source.read(length))
+        with self.server.lock:
+            self.server.bytes_sent += length
+
+    def log_message(self, format, *args):
+        pass
+
+
+class range_server(ThreadingHTTPServer):
+    def __init__(self, directory, port=0):
+        handler = lambda *args, **kwargs: range_request_handler(*args, directory=directory, **kwargs)
+        super().__init__(("127.0.0.1", port), handler)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+
+    def url(self, filename):
+        return f"http://127.0.0.1:{self.server_address[1]}/{filename}"
+
+    # Serves from a background thread, stop with shutdown()
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else "."
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8000
+
+    server = range_server(directory, port)
+    print(f"Serving {os.path.abspath(directory)} at http://127.0.0.1:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+    print(f"REQUESTS: {server.requests} BYTES SENT: {server.bytes_sent}")
+
+
+if __name__ == "__main__":
+    main()
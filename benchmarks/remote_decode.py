@@ -0,0 +1,223 @@
+# MIT License
+
+# Copyright (c) 2023 Voxed Team
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Remote decode check: writes synthetic recordings, decodes them through the
+# file, mmap and HTTP range backends (served by range_server) and fails unless
+# every backend produces the same files as the full sequential scan. Reports
+# requests and bytes transferred against the file size.
+#
+# Usage: python benchmarks/remote_decode.py
+
+import contextlib
+import filecmp
+import io
+import os
+import struct
+import sys
+import tempfile
+
+PROJECT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_PATH)
+
+import numpy as np
+import xed_reader
+from range_server import range_server
+
+WIDTH = 320
+HEIGHT = 240
+DEDUP_THRESHOLD = 1.0
+
+
+# Writes an XED file with one index per stream; events are (stream, timestamp, width, height, payload)
+def write_recording(filename, num_streams, events):
+    offsets = [[] for _ in range(num_streams)]
+
+    with open(filename, mode='wb') as xed_file:
+        xed_file.write(b'EVENTS1\x00' + struct.pack("<III", 1, num_streams, 0) + bytes(4))
+
+        for sequence, (stream, timestamp, width, height, payload) in enumerate(events):
+            offsets[stream].append((xed_file.tell(), timestamp, len(payload)))
+            xed_file.write(struct.pack("<HHIQII", stream, 0, len(payload), timestamp, 0, len(payload)))
+            if timestamp != 0:
+                xed_file.write(struct.pack(">HHHHHHH", 1, 0, 1, 1, width, height, sequence & 0xffff)
+                               + bytes(6) + struct.pack(">I", timestamp & 0xffffffff))
+            xed_file.write(payload)
+
+        # End stream information, each followed by the offset of its index
+        index_file_offset = xed_file.tell()
+        xed_file.write(struct.pack("<H", num_streams))
+        index_offset_positions = []
+        for stream in range(num_streams):
+            total = len(offsets[stream])
+            xed_file.write(struct.pack("<HHHHIIII", 0xffff, 0xffff, stream, 0, total, 0, max(total, 1), 1))
+            xed_file.write(bytes(24 * 4))
+            index_offset_positions.append(xed_file.tell())
+            xed_file.write(bytes(8 + 4))
+
+        for stream in range(num_streams):
+            index_offset = xed_file.tell()
+            xed_file.write(struct.pack("<HHIIIII", 0xffff, 0, len(offsets[stream]), 0, 0, 0, 0))
+            for offset, timestamp, length in offsets[stream]:
+                xed_file.write(struct.pack("<QQII", offset, timestamp, length, length))
+
+            xed_file.seek(index_offset_positions[stream])
+            xed_file.write(struct.pack("<Q", index_offset))
+            xed_file.seek(0, 2)
+
+        xed_file.seek(16)
+        xed_file.write(struct.pack("<I", index_file_offset))
+
+
+# Colour frames come in runs of identical frames so near-duplicate suppression has work to do
+def colour_frame(frame):
+    return np.random.default_rng(frame // 25).integers(0, 256, WIDTH * HEIGHT, dtype=np.uint8).tobytes()
+
+
+def recordings():
+    # One colour stream whose first event is empty and has no frame info
+    leading_empty = [(0, 0, 0, 0, b"")]
+    leading_empty += [(0, 1000 + i, WIDTH, HEIGHT, colour_frame(i)) for i in range(200)]
+
+    # Colour frames interleaved with a stream that never has frame info, and an empty event mid-way
+    interleaved = []
+    for i in range(150):
+        interleaved.append((0, 1000 + i, WIDTH, HEIGHT, colour_frame(i)))
+        interleaved.append((1, 0, 0, 0, bytes(1000)))
+        if i == 70:
+            interleaved.append((0, 0, 0, 0, b""))
+
+    # More leading empty events than a stream used to be probed for, followed by colour frames
+    many_leading_empty = [(0, 0, 0, 0, b"") for _ in range(9)]
+    many_leading_empty += [(0, 1000 + i, WIDTH, HEIGHT, colour_frame(i)) for i in range(300)]
+
+    # Colour frames with a depth frame part-way, where xed_decode returns early
+    depth_colour = []
+    for i in range(60):
+        depth_colour.append((1, 1000 + i, WIDTH, HEIGHT, colour_frame(i)))
+        if i == 45:
+            depth_colour.append((0, 2000 + i, WIDTH, HEIGHT, bytes(WIDTH * HEIGHT * 2)))
+
+    return {
+        "leading_empty": (1, leading_empty),
+        "many_leading_empty": (1, many_leading_empty),
+        "interleaved": (2, interleaved),
+        "depth_colour": (2, depth_colour),
+    }
+
+
+def run_quietly(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+def assert_same_files(expected_path, actual_path, label):
+    expected = sorted(os.listdir(expected_path))
+    actual = sorted(os.listdir(actual_path))
+    if expected != actual:
+        raise Exception(f"ERROR: {label} produced {actual}, expected {expected}")
+
+    _, mismatch, errors = filecmp.cmpfiles(expected_path, actual_path, expected, shallow=False)
+    if mismatch or errors:
+        raise Exception(f"ERROR: {label} differs in {mismatch + errors}")
+
+
+def main():
+    failed = False
+
+    with tempfile.TemporaryDirectory() as work_path:
+        server = range_server(work_path).start()
+
+        # The depth branch writes its snapshot to the working directory
+        previous_path = os.getcwd()
+        os.chdir(work_path)
+
+        try:
+            for name, (num_streams, events) in recordings().items():
+                filename = os.path.join(work_path, f"{name}.xed")
+                write_recording(filename, num_streams, events)
+                file_size = os.path.getsize(filename)
+
+                for dedup_threshold in [None, DEDUP_THRESHOLD]:
+                    label = f"{name} dedup={dedup_threshold}"
+
+                    # The verbose decode reads every event, it is the reference
+                    reference_path = tempfile.mkdtemp(dir=work_path)
+                    run_quietly(xed_reader.xed_decode, filename, reference_path, verbose=True,
+                                dedup_threshold=dedup_threshold)
+                    images = len([f for f in os.listdir(reference_path) if f.endswith(".bmp")])
+
+                    if dedup_threshold is not None and not os.path.isfile(os.path.join(reference_path, "manifest.csv")):
+                        print(f"FAIL {label}: no manifest written")
+                        failed = True
+
+                    for backend in ["file", "mmap", "http"]:
+                        output_path = tempfile.mkdtemp(dir=work_path)
+                        path = server.url(f"{name}.xed") if backend == "http" else filename
+                        requests, bytes_sent = server.requests, server.bytes_sent
+
+                        try:
+                            run_quietly(xed_reader.xed_decode, path, output_path, verbose=False,
+                                        dedup_threshold=dedup_threshold, backend=backend)
+                            assert_same_files(reference_path, output_path, f"{label} {backend}")
+                        except Exception as e:
+                            print(f"FAIL {label} {backend}: {e}")
+                            failed = True
+                            continue
+
+                        if backend == "http":
+                            requests, bytes_sent = server.requests - requests, server.bytes_sent - bytes_sent
+                            print(f"{label}: {images} images, {requests} requests, "
+                                  f"{bytes_sent} / {file_size} bytes ({100 * bytes_sent / file_size:.1f}%)")
+
+                            if bytes_sent >= file_size / 2:
+                                print(f"FAIL {label}: sampled decode transferred too much")
+                                failed = True
+
+                # Contact sheets must match across backends
+                previews = []
+                for backend in ["file", "mmap", "http"]:
+                    preview_filename = os.path.join(work_path, f"{name}-{backend}.bmp")
+                    path = server.url(f"{name}.xed") if backend == "http" else filename
+                    try:
+                        run_quietly(xed_reader.xed_preview, path, preview_filename, backend=backend)
+                        previews.append(preview_filename)
+                    except Exception as e:
+                        print(f"FAIL {name} preview {backend}: {e}")
+                        failed = True
+
+                if len(previews) == 3 and not all(filecmp.cmp(previews[0], p, shallow=False) for p in previews[1:]):
+                    print(f"FAIL {name} preview: contact sheets differ between backends")
+                    failed = True
+        finally:
+            server.shutdown()
+            os.chdir(previous_path)
+
+    if failed:
+        print("FAIL")
+        sys.exit(1)
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,21 +24,55 @@
 import azure.functions as func
 import logging
 
+import math
 import os
-from PIL import Image
-import cv2
-import numpy as np
-import xed_reader
-import random
-import string
 import tempfile
-from io import BytesIO
-from urllib.parse import quote
 import shutil
 
 
 app = func.FunctionApp(http_auth_level=func.AuthLevel.ANONYMOUS)
 
+MAX_PREVIEW_FRAMES = 64
+
+# xed_reader pulls in cv2, PIL and numpy, so it is only imported on first use
+_xed_reader = None
+
+
+def get_xed_reader():
+    global _xed_reader
+    if _xed_reader is None:
+        import xed_reader
+        _xed_reader = xed_reader
+    return _xed_reader
+
+
+# Loads the codecs and runs the decode path once so the first request doesn't pay for it
+def warm_up_decoder():
+    xed_reader = get_xed_reader()
+    xed_reader.xed_warmup()
+    print("Decoder warmed up")
+
+
+# The warmup trigger only exists in newer azure-functions releases, older ones still serve XedDecode
+if hasattr(app, "warm_up_trigger"):
+    @app.warm_up_trigger("warmup")
+    def warmup(warmup) -> None:
+        warm_up_decoder()
+
+
+@app.route(route="Warmup", methods=["GET"])
+def Warmup(req: func.HttpRequest) -> func.HttpResponse:
+    try:
+        warm_up_decoder()
+    except Exception as e:
+        print(e)
+        return func.HttpResponse(
+            "Error warming up decoder",
+            status_code=500
+        )
+
+    return func.HttpResponse("OK", status_code=200)
+
 @app.route(route="XedDecode", methods=["POST"])
 def XedDecode(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request.')
@@ -56,26 +90,52 @@ def XedDecode(req: func.HttpRequest) -> func.HttpResponse:
     # Get the xed file from req body
     file = req.files["file"]
 
-    # Generates string to use on paths
-    random_string = ''.join(random.choice(string.ascii_lowercase) for _ in range(8))
-    image_folder_path = os.path.join(tempfile.gettempdir(), random_string)
-    print("Random string: " + random_string)
-
-    while os.path.exists(image_folder_path):
-        random_string = ''.join(random.choice(string.ascii_lowercase) for _ in range(8))
-        image_folder_path = os.path.join(tempfile.gettempdir(), random_string)
-
-    # Creates folder for the decoded images
+    # Preview mode returns a single contact sheet instead of the zip of snapshots
+    preview = req.params.get("preview", "").lower() in ("1", "true", "yes")
+    preview_frames = 16
+    if preview:
+        try:
+            preview_frames = int(req.params.get("frames", 16))
+        except ValueError:
+            preview_frames = 0
+
+        if preview_frames <= 0:
+            return func.HttpResponse(
+                "Invalid \"frames\" parameter",
+                status_code=400
+            )
+
+        # Bounds the contact sheet size
+        preview_frames = min(preview_frames, MAX_PREVIEW_FRAMES)
+
+    # Optional near-duplicate suppression threshold (mean absolute difference, 0-255)
+    dedup_threshold = req.params.get("dedup")
+    if dedup_threshold is not None:
+        try:
+            dedup_threshold = float(dedup_threshold)
+        except ValueError:
+            dedup_threshold = -1.0
+
+        # nan would turn dedup off silently and inf would drop every frame after the first
+        if not math.isfinite(dedup_threshold) or dedup_threshold < 0:
+            return func.HttpResponse(
+                "Invalid \"dedup\" parameter",
+                status_code=400
+            )
+
+    # Creates folder for the decoded images, its unique name is reused for the other paths
     try:
-        os.mkdir(image_folder_path)
+        image_folder_path = tempfile.mkdtemp()
     except Exception as e:
         print(e)
-        remove_files(img_folder_path=image_folder_path)
         return func.HttpResponse(
             f"Unexpected server error",
             status_code=500
         )
 
+    random_string = os.path.basename(image_folder_path)
+    print("Random string: " + random_string)
+
     # Saves the xed file temporarily
     xed_temp_filename = os.path.join(tempfile.gettempdir(),f"{random_string}.xed")
 
@@ -93,7 +153,10 @@ def XedDecode(req: func.HttpRequest) -> func.HttpResponse:
     
     # Extract the images from the xed file
     try:
-        xed_reader.xed_decode(xed_temp_filename, image_folder_path, verbose=False)
+        xed_reader = get_xed_reader()
+        xed_reader.xed_decode(xed_temp_filename, image_folder_path, verbose=False,
+                              preview=preview, preview_frames=preview_frames,
+                              dedup_threshold=dedup_threshold)
 
     except Exception as e:
         print(e)
@@ -106,6 +169,30 @@ def XedDecode(req: func.HttpRequest) -> func.HttpResponse:
         )
     
     print(f"{random_string}.xed decoded")
+
+    # Returns the contact sheet directly
+    if preview:
+        try:
+            with open(os.path.join(image_folder_path, "contact_sheet.bmp"), 'rb') as preview_file:
+                preview_data = preview_file.read()
+        except Exception as e:
+            print(e)
+            remove_files(xed_path=xed_temp_filename,
+                            img_folder_path=image_folder_path)
+            return func.HttpResponse(
+                f"Unexpected server error",
+                status_code=500
+            )
+
+        remove_files(xed_path=xed_temp_filename,
+                    img_folder_path=image_folder_path)
+
+        return func.HttpResponse(
+            preview_data,
+            status_code=200,
+            mimetype="image/bmp",
+            headers={"Content-Disposition": f"attachment;filename=preview.bmp"}
+        )
     
     # Generates a zip with the extracted images
     try:
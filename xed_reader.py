@@ -49,22 +49,32 @@ from PIL import Image
 import cv2
 import numpy as np
 import os
+import csv
 import time
 from datetime import datetime
+from xed_source import xed_open_source, xed_is_url
 
 XED_MAX_STREAMS = 10
 SIZE_UINT_64 = 8
 XED_STREAM_ALL = -1
 RGB_MAX = 255
 V_MAX = 4096
+EVENT_HEADER_SIZE = 24
+FRAME_INFO_SIZE = 24
+
+# Kind of frames carried by a stream
+XED_KIND_DEPTH = "depth"
+XED_KIND_COLOUR = "colour"
+XED_KIND_OTHER = "other"
 
 def read_int(file, num_bytes, byteorder="little"):
     return int.from_bytes(file.read(num_bytes), byteorder=byteorder)
 
 class xed_reader:
-    def __init__(self, filepath):
-        # The path to the xed file
+    def __init__(self, filepath, backend=None):
+        # The path (or URL) to the xed file and the byte source backend used to read it
         self.filepath = filepath 
+        self.backend = backend
         
         # Xed file metadata
         self.xed_header = None
@@ -73,7 +83,7 @@ class xed_reader:
         self.total_events = 0
         self.global_index = None
 
-        with open(filepath, mode='rb') as xed_file:
+        with xed_open_source(filepath, backend) as xed_file:
             # Reads XED Header
             self.xed_header = xed_header(xed_file)
                             
@@ -419,123 +429,273 @@ def xed_read_event(xed_file, reader, stream, index, buffer, bufferSize,verbose):
         xed_file.seek(size - readSize, 1)
 
     return event, frameInfo, buffer
-            
-def xed_decode(filepath, store_path="", verbose=True):
+
+
+# Frame size of each stream, taken from its first event with a timestamp (only those carry frame
+# info). A stream is left as None, and its timestamped events are read one by one, when it has no
+# such event or when that event's index entry doesn't describe it the way its header does.
+def xed_stream_geometries(xed_file, reader, bufferSize):
+    geometries = [None for _ in range(XED_MAX_STREAMS)]
+
+    for stream in range(min(reader.xed_header.num_streams, XED_MAX_STREAMS)):
+        if reader.stream_info[stream] is None or reader.stream_index[stream] is None:
+            continue
+
+        for index in range(reader.stream_info[stream].totalIndexEntries):
+            entry = xed_get_index_entry(reader, stream, index)
+            if entry.indexEntry is None:
+                break
+
+            # Events without a timestamp are classified from the index alone, no need to read them
+            if entry.indexEntry.frame_timestamp == 0:
+                continue
+
+            frame, frameInfo, _ = xed_read_event(xed_file, reader, stream, index, None, bufferSize, False)
+            if frame.length == entry.indexEntry.data_size and frame.timestamp != 0:
+                geometries[stream] = (frameInfo.width, frameInfo.height)
+            break
+
+    return geometries
+
+
+# Kind of an event worked out from its index entry, with the same checks xed_decode makes on the
+# event header. Returns (kind, has frame info); kind is None when the event has to be read.
+def xed_index_event_kind(entry, geometries):
+    if entry.indexEntry is None:
+        return None, False
+
+    # Events without a timestamp carry no frame info, so their width and height read as 0
+    if entry.indexEntry.frame_timestamp == 0:
+        width, height = 0, 0
+    elif geometries[entry.streamId] is not None:
+        width, height = geometries[entry.streamId]
+    else:
+        return None, False
+
+    has_info = width > 0 and height > 0
+
+    if entry.indexEntry.data_size == width * height * 2:
+        return XED_KIND_DEPTH, has_info
+    elif entry.indexEntry.data_size == width * height * 1:
+        return XED_KIND_COLOUR, has_info
+
+    return XED_KIND_OTHER, False
+
+
+# Global index packets that xed_decode reads: every 30th depth frame, every 10th colour frame
+# and every event that can't be classified from the index
+def xed_plan_events(reader, geometries):
+    packets = []
+    count_0, count_1 = 0, 0
+
+    for packet in range(reader.total_events):
+        kind, has_info = xed_index_event_kind(reader.global_index[packet], geometries)
+
+        if kind == XED_KIND_DEPTH:
+            if has_info and (count_0 % 30) == 0:
+                packets.append(packet)
+            count_0 += 1
+        elif kind == XED_KIND_COLOUR:
+            if has_info and (count_1 % 10) == 0:
+                packets.append(packet)
+            count_1 += 1
+        elif kind is None:
+            packets.append(packet)
+
+    return packets
+
+
+# (offset, size) byte ranges covering the header, frame info and payload of each packet
+def xed_plan_reads(reader, packets):
+    ranges = []
+
+    for packet in packets:
+        entry = reader.global_index[packet].indexEntry
+        if entry is not None:
+            ranges.append((entry.frame_file_offset, EVENT_HEADER_SIZE + FRAME_INFO_SIZE + entry.data_size))
+
+    return ranges
+
+
+def xed_decode(filepath, store_path="", verbose=True, preview=False, preview_frames=16, preview_columns=4, dedup_threshold=None, backend=None):
     start_time = time.perf_counter()
     start_date_time = datetime.now()
 
-    if(not os.path.isfile(filepath)):
+    if(not xed_is_url(filepath) and not os.path.isfile(filepath)):
         raise Exception("File not found!")
 
+    # Preview mode: a single half-resolution contact sheet instead of full snapshots
+    if preview:
+        filename = os.path.join(store_path, "contact_sheet.bmp")
+        sheet = xed_preview(filepath, filename, preview_frames, preview_columns, verbose, backend)
+
+        finish_time = time.perf_counter()
+        print(f"\nPREVIEW STORED AT {filename}\n" +
+              f"ELAPSED TIME: {finish_time - start_time}")
+        return sheet
+
     bufferSize = 1024 * 768 * 3
-    reader = xed_reader(filepath)
+    reader = xed_reader(filepath, backend)
     buffer = bytearray(bufferSize)
     count_0, count_1 = 0, 0
 
-    with open(reader.filepath, mode='rb') as xed_file:
-
-        if verbose:
-            print("XED,packet,stream,type,len,time,unknown,len2"
-                ",unk1,unk2,unk3,unk4,width,height,seq,unk5,time")
-            # Adjust read position
-            print("f: ",xed_file.tell())
-
-        # Read packets
-        for packet in range(xed_get_num_events(reader, XED_STREAM_ALL)):
-            frame, frameInfo, buffer = xed_read_event(xed_file, reader, XED_STREAM_ALL, packet, buffer, bufferSize,verbose)
-            buffer = bytearray(buffer)
-
-            if verbose == True:
-                print(f"XED,{packet}    ,{frame.streamId}    ,{frame._flags}  ,{frame.length} ,{frame.timestamp},{hex(frame._unknown1)} ,{frame.length2}  ")
+    # Near-duplicate suppression state: [filename, first packet, last packet, sampled packets] per emitted image
+    last_signature = None
+    manifest = []
+    dropped = 0
+
+    try:
+        with xed_open_source(reader.filepath, reader.backend) as xed_file:
+
+            if verbose:
+                print("XED,packet,stream,type,len,time,unknown,len2"
+                    ",unk1,unk2,unk3,unk4,width,height,seq,unk5,time")
+                # Adjust read position
+                print("f: ",xed_file.tell())
+
+            # Without verbose output only the sampled events are read, planned from the index
+            geometries = None
+            if not verbose:
+                geometries = xed_stream_geometries(xed_file, reader, bufferSize)
+                xed_file.plan(xed_plan_reads(reader, xed_plan_events(reader, geometries)))
+
+            # Read packets
+            for packet in range(xed_get_num_events(reader, XED_STREAM_ALL)):
+                if geometries is not None:
+                    kind, has_info = xed_index_event_kind(reader.global_index[packet], geometries)
+
+                    # Skip events that would not be saved without reading them
+                    if kind == XED_KIND_DEPTH and not (has_info and (count_0 % 30) == 0):
+                        count_0 += 1
+                        continue
+                    elif kind == XED_KIND_COLOUR and not (has_info and (count_1 % 10) == 0):
+                        if len(manifest) > 0:
+                            manifest[-1][2] = packet
+                        count_1 += 1
+                        continue
+                    elif kind == XED_KIND_OTHER:
+                        continue
+
+                frame, frameInfo, buffer = xed_read_event(xed_file, reader, XED_STREAM_ALL, packet, buffer, bufferSize,verbose)
+                buffer = bytearray(buffer)
+
+                if verbose == True:
+                    print(f"XED,{packet}    ,{frame.streamId}    ,{frame._flags}  ,{frame.length} ,{frame.timestamp},{hex(frame._unknown1)} ,{frame.length2}  ")
                 
-                if frame.streamId != int("0xffff",16):
-                    #     ",unk1,unk2,unk3,unk4,width,height,seq,unk5,time"
-                    print(f",{frameInfo._unknown1}  ,{frameInfo._unknown2}  ,{frameInfo._unknown3}  ,{frameInfo._unknown4}  ,{frameInfo.width}   ,{frameInfo.height}    ,{frameInfo.sequenceNumber} ,{frameInfo._unknown5}  ,{frameInfo.timestamp}  ")
-                else:
-                    print(",,,,,,,,,", end="")
+                    if frame.streamId != int("0xffff",16):
+                        #     ",unk1,unk2,unk3,unk4,width,height,seq,unk5,time"
+                        print(f",{frameInfo._unknown1}  ,{frameInfo._unknown2}  ,{frameInfo._unknown3}  ,{frameInfo._unknown4}  ,{frameInfo.width}   ,{frameInfo.height}    ,{frameInfo.sequenceNumber} ,{frameInfo._unknown5}  ,{frameInfo.timestamp}  ")
+                    else:
+                        print(",,,,,,,,,", end="")
     
-            if frame.length == frameInfo.width * frameInfo.height * 2:
-                # Not tested
-
-                # Save snapshots
-                if (count_0 % 30) == 0 and frameInfo.width > 0 and frameInfo.height > 0:
-                    width = frameInfo.width
-                    height = frameInfo.height
-
-                    i = 0
-                    for y in range(height):
-                        p = int.from_bytes(buffer[:2], byteorder="big") +y * (width * 2)
-                        for x in range(width):
-                            #v = int.from_bytes(buffer[:2], byteorder="big")
-                            v = p
-                            v &= int("0x0fff",16)  # Mask for depth-only
-
-                        # Stretch
-                        if v < 850:
-                             v = 0
-                        else: 
-                            v = (int)((v - 850) * 4096 / (4000 - 850))
-                            if v >= 4096:
-                                v = 4095
-                        
-                        z = (int)(RGB_MAX * (v % (V_MAX / 6 + 1)) / (V_MAX / 6 + 1))
-
-                        if (v < (1 * V_MAX / 6)):
-                            r = RGB_MAX
-                            g = z
-                            b = 0 
-                        elif (v < (2 * V_MAX / 6)):
-                            r = RGB_MAX - z
-                            g = RGB_MAX
-                            b = 0
-                        elif (v < (3 * V_MAX / 6)):
-                            r = 0
-                            g = RGB_MAX
-                            b = z
-                        elif (v < (4 * V_MAX / 6)):
-                            r = 0
-                            g = RGB_MAX - z
-                            b = RGB_MAX
-                        elif (v < (5 * V_MAX / 6)):
-                            r = z
-                            g = 0
-                            b = RGB_MAX
-                        else:
-                            r = RGB_MAX
-                            g = z
-                            b = RGB_MAX
-
-                        # Convert to RGB555
-                        v = ((r >> 3) << 10) | ((g >> 3) << 5) | ((b >> 3) << 0)
-
-                        v += 2
-                        v = int.to_bytes(v,2,byteorder="little")
-
-                        # Write back (little endian)
-                        # buffer[y * (width * 2) + i] = v
-                        # buffer[y * (width * 2) + i + 1] = v >> 8
-                        buffer[y * (width * 2) + i : y * (width * 2) + i + 1] = v
-
-                    img = Image.frombytes("P", (width,height), buffer)
-                    img_array = np.array(img)                          
-                    #img_rgb = cv2.cvtColor(img_array, cv2.COLOR_BayerGRBG2BGR) # Conversion to RGB
-                    cv2.imwrite(f"out16_{count_0/30}.bmp", img_array)
-                    return img_array
-
-                count_0 += 1
-
-            elif frame.length == frameInfo.width * frameInfo.height * 1: # Colour data in GRBG bayer pattern
+                if frame.length == frameInfo.width * frameInfo.height * 2:
+                    # Not tested
+
                     # Save snapshots
-                    if (count_1 % 10) == 0 and frameInfo.width > 0 and frameInfo.height > 0:
+                    if (count_0 % 30) == 0 and frameInfo.width > 0 and frameInfo.height > 0:
                         width = frameInfo.width
                         height = frameInfo.height
 
-                        # Generate img
-                        filename = f"out32-{count_1/10}.bmp"
-                        filename = os.path.join(store_path,filename)
-                        extract_image_from_bytes(buffer, width, height, filename)
-
-                    count_1 += 1
+                        i = 0
+                        for y in range(height):
+                            p = int.from_bytes(buffer[:2], byteorder="big") +y * (width * 2)
+                            for x in range(width):
+                                #v = int.from_bytes(buffer[:2], byteorder="big")
+                                v = p
+                                v &= int("0x0fff",16)  # Mask for depth-only
+
+                            # Stretch
+                            if v < 850:
+                                 v = 0
+                            else: 
+                                v = (int)((v - 850) * 4096 / (4000 - 850))
+                                if v >= 4096:
+                                    v = 4095
+                        
+                            z = (int)(RGB_MAX * (v % (V_MAX / 6 + 1)) / (V_MAX / 6 + 1))
+
+                            if (v < (1 * V_MAX / 6)):
+                                r = RGB_MAX
+                                g = z
+                                b = 0 
+                            elif (v < (2 * V_MAX / 6)):
+                                r = RGB_MAX - z
+                                g = RGB_MAX
+                                b = 0
+                            elif (v < (3 * V_MAX / 6)):
+                                r = 0
+                                g = RGB_MAX
+                                b = z
+                            elif (v < (4 * V_MAX / 6)):
+                                r = 0
+                                g = RGB_MAX - z
+                                b = RGB_MAX
+                            elif (v < (5 * V_MAX / 6)):
+                                r = z
+                                g = 0
+                                b = RGB_MAX
+                            else:
+                                r = RGB_MAX
+                                g = z
+                                b = RGB_MAX
+
+                            # Convert to RGB555
+                            v = ((r >> 3) << 10) | ((g >> 3) << 5) | ((b >> 3) << 0)
+
+                            v += 2
+                            v = int.to_bytes(v,2,byteorder="little")
+
+                            # Write back (little endian)
+                            # buffer[y * (width * 2) + i] = v
+                            # buffer[y * (width * 2) + i + 1] = v >> 8
+                            buffer[y * (width * 2) + i : y * (width * 2) + i + 1] = v
+
+                        img = Image.frombytes("P", (width,height), buffer)
+                        img_array = np.array(img)                          
+                        #img_rgb = cv2.cvtColor(img_array, cv2.COLOR_BayerGRBG2BGR) # Conversion to RGB
+                        cv2.imwrite(f"out16_{count_0/30}.bmp", img_array)
+                        return img_array
+
+                    count_0 += 1
+
+                elif frame.length == frameInfo.width * frameInfo.height * 1: # Colour data in GRBG bayer pattern
+                        # Save snapshots
+                        if (count_1 % 10) == 0 and frameInfo.width > 0 and frameInfo.height > 0:
+                            width = frameInfo.width
+                            height = frameInfo.height
+
+                            # Skip frames too close to the last emitted one (checked on the raw Bayer data)
+                            emit = True
+                            if dedup_threshold is not None:
+                                signature = xed_frame_signature(buffer, width, height)
+                                if (last_signature is not None and len(manifest) > 0
+                                        and xed_signature_distance(signature, last_signature) < dedup_threshold):
+                                    emit = False
+                                    manifest[-1][3].append(packet)
+                                    dropped += 1
+                                else:
+                                    last_signature = signature
+
+                            if emit:
+                                # Generate img
+                                filename = f"out32-{count_1/10}.bmp"
+                                filename = os.path.join(store_path,filename)
+                                extract_image_from_bytes(buffer, width, height, filename)
+                                manifest.append([os.path.basename(filename), packet, packet, [packet]])
+
+                        # Every colour event up to the next exported image is represented by the last one
+                        if len(manifest) > 0:
+                            manifest[-1][2] = packet
+
+                        count_1 += 1
+    finally:
+        # Also runs when the depth branch returns early, so the manifest is always written
+        if dedup_threshold is not None:
+            xed_write_manifest(os.path.join(store_path, "manifest.csv"), manifest)
+            print(f"\nNEAR-DUPLICATES DROPPED: {dropped}")
+
+    if not verbose:
+        print(f"\nREAD {xed_file.bytes_read} BYTES IN {xed_file.requests} REQUESTS")
 
     if(store_path != ""):
         print(f"\nIMAGES STORED AT {store_path}")
@@ -557,6 +717,127 @@ def extract_image_from_bytes(buffer, width, height, filename):
     return img_rgb
 
 
+# Cheap change-detection signature taken straight from the raw Bayer payload
+def xed_frame_signature(buffer, width, height, step=16):
+    raw = np.frombuffer(buffer, dtype=np.uint8, count=width * height).reshape(height, width)
+    # An even step keeps every sample on the top-left G site of the GRBG cells
+    return raw[0::step, 0::step].astype(np.int16)
+
+
+# Mean absolute difference (0-255) between two signatures
+def xed_signature_distance(signature, other):
+    if signature.shape != other.shape:
+        return float(RGB_MAX)
+    return float(np.mean(np.abs(signature - other)))
+
+
+# Writes which source events each exported image represents: the span of global packets its
+# colour frames came from and the sampled packets that were compared against it
+def xed_write_manifest(filename, manifest):
+    with open(filename, mode='w', newline='') as manifest_file:
+        writer = csv.writer(manifest_file)
+        writer.writerow(["filename", "first_packet", "last_packet", "sampled_packets"])
+        for image_filename, first_packet, last_packet, sampled in manifest:
+            writer.writerow([image_filename, first_packet, last_packet, " ".join(str(p) for p in sampled)])
+
+
+# Half-resolution preview: each GRBG 2x2 cell becomes one BGR pixel (no interpolation)
+def extract_preview_from_bytes(buffer, width, height):
+    # Drop a trailing odd row/column so every pixel has a full Bayer cell
+    even_width = width & ~1
+    even_height = height & ~1
+
+    raw = np.frombuffer(buffer, dtype=np.uint8, count=width * height).reshape(height, width)
+    raw = raw[:even_height, :even_width]
+
+    # GRBG layout:  G R
+    #               B G
+    g1 = raw[0::2, 0::2]
+    r  = raw[0::2, 1::2]
+    b  = raw[1::2, 0::2]
+    g2 = raw[1::2, 1::2]
+
+    g = ((g1.astype(np.uint16) + g2) >> 1).astype(np.uint8)
+    return np.dstack((b, g, r))
+
+
+# Tiles evenly spaced colour frames from the index into a single contact sheet
+def xed_preview(filepath, filename="contact_sheet.bmp", num_frames=16, columns=4, verbose=True, backend=None):
+    if num_frames <= 0 or columns <= 0:
+        raise Exception("Invalid argument")
+
+    reader = xed_reader(filepath, backend)
+    bufferSize = 1024 * 768 * 3
+    thumbnails = []
+
+    with xed_open_source(reader.filepath, reader.backend) as xed_file:
+        # Candidates are the colour frames known from the index plus the events that can't be classified
+        geometries = xed_stream_geometries(xed_file, reader, bufferSize)
+        candidates = []
+        for packet in range(reader.total_events):
+            kind, has_info = xed_index_event_kind(reader.global_index[packet], geometries)
+            if (kind == XED_KIND_COLOUR and has_info) or kind is None:
+                candidates.append(packet)
+
+        num_frames = min(num_frames, len(candidates))
+        starts = [i * len(candidates) // num_frames for i in range(num_frames)]
+        xed_file.plan(xed_plan_reads(reader, [candidates[i] for i in starts]))
+
+        last_candidate = -1
+        for start in starts:
+            # Walk forward from the evenly spaced candidate to the next actual colour frame
+            candidate = max(start, last_candidate + 1)
+
+            while candidate < len(candidates):
+                packet = candidates[candidate]
+                frame, frameInfo, buffer = xed_read_event(xed_file, reader, XED_STREAM_ALL, packet, None, bufferSize, False)
+
+                if frameInfo.width > 0 and frameInfo.height > 0 and frame.length == frameInfo.width * frameInfo.height * 1:
+                    thumbnails.append(extract_preview_from_bytes(buffer, frameInfo.width, frameInfo.height))
+                    if verbose:
+                        print(f"PREVIEW,{len(thumbnails) - 1},{packet}")
+                    break
+
+                candidate += 1
+
+            last_candidate = candidate
+            if candidate >= len(candidates):
+                break
+
+    if len(thumbnails) == 0:
+        raise Exception("ERROR: No colour frames found")
+
+    # Every tile uses the size of the first thumbnail
+    tile_height, tile_width = thumbnails[0].shape[:2]
+    columns = min(columns, len(thumbnails))
+    rows = (len(thumbnails) + columns - 1) // columns
+
+    sheet = np.zeros((rows * tile_height, columns * tile_width, 3), dtype=np.uint8)
+    for i, thumbnail in enumerate(thumbnails):
+        y = (i // columns) * tile_height
+        x = (i % columns) * tile_width
+        h = min(tile_height, thumbnail.shape[0])
+        w = min(tile_width, thumbnail.shape[1])
+        sheet[y:y + h, x:x + w] = thumbnail[:h, :w]
+
+    cv2.imwrite(filename, sheet)
+    return sheet
+
+
+# Runs the decode path on a tiny synthetic frame so OpenCV and NumPy are fully initialised
+def xed_warmup(width=64, height=48):
+    buffer = bytes(width * height)
+
+    img_rgb = cv2.cvtColor(np.frombuffer(buffer, dtype=np.uint8).reshape(height, width), cv2.COLOR_BayerGRBG2BGR)
+    cv2.imencode(".bmp", img_rgb)
+
+    preview = extract_preview_from_bytes(buffer, width, height)
+    cv2.imencode(".bmp", preview)
+
+    signature = xed_frame_signature(buffer, width, height)
+    xed_signature_distance(signature, signature)
+
+
 def main():
     filepath = input("Filepath:")
 
@@ -0,0 +1,322 @@
+# MIT License
+
+# Copyright (c) 2023 Voxed Team
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Byte sources used by xed_reader. Every source behaves like a binary file
+# (read/seek/tell/close), so the parser doesn't care where the bytes come from.
+
+import bisect
+import mmap
+import os
+import threading
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+XED_BLOCK_SIZE = 64 * 1024          # Minimum fetch for reads outside the plan
+XED_CACHE_SIZE = 32 * 1024 * 1024   # Maximum bytes kept by the block cache
+XED_READAHEAD = 2                   # Planned ranges fetched in the background ahead of the reader
+XED_MAX_GAP = 4 * 1024              # Ranges closer than this are merged into one read
+
+
+def xed_is_url(path):
+    return isinstance(path, str) and path.lower().startswith(("http://", "https://"))
+
+
+# Sorts (offset, size) ranges and merges the ones that touch or are at most max_gap apart, as long
+# as the merged range stays within max_size bytes
+def xed_merge_ranges(ranges, max_gap=0, max_size=None):
+    merged = []
+
+    for offset, size in sorted(ranges):
+        if size <= 0:
+            continue
+
+        end = max(merged[-1][0] + merged[-1][1], offset + size) if merged else 0
+        if (merged and offset <= merged[-1][0] + merged[-1][1] + max_gap
+                and (max_size is None or end - merged[-1][0] <= max_size)):
+            merged[-1] = (merged[-1][0], end - merged[-1][0])
+        else:
+            merged.append((offset, size))
+
+    return merged
+
+
+class xed_byte_source:
+    def __init__(self):
+        self.position = 0
+        self.size = 0
+
+        # Transfer statistics
+        self.requests = 0
+        self.bytes_read = 0
+
+    # Returns size bytes starting at offset, implemented by each backend
+    def read_range(self, offset, size):
+        raise NotImplementedError()
+
+    # Hint with the (offset, size) ranges that are about to be read, ignored by local backends
+    def plan(self, ranges):
+        pass
+
+    def read(self, size=-1):
+        if size is None or size < 0 or self.position + size > self.size:
+            size = self.size - self.position
+
+        if size <= 0:
+            return b""
+
+        data = self.read_range(self.position, size)
+        self.position += len(data)
+        return data
+
+    def seek(self, offset, whence=0):
+        if whence == 0:
+            self.position = offset
+        elif whence == 1:
+            self.position += offset
+        elif whence == 2:
+            self.position = self.size + offset
+        else:
+            raise Exception("Invalid argument")
+
+        if self.position < 0:
+            raise Exception("ERROR: Negative seek position")
+
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class xed_file_source(xed_byte_source):
+    def __init__(self, filepath):
+        super().__init__()
+        self.file = open(filepath, mode='rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+
+    def read_range(self, offset, size):
+        self.file.seek(offset)
+        data = self.file.read(size)
+        self.requests += 1
+        self.bytes_read += len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+class xed_mmap_source(xed_byte_source):
+    def __init__(self, filepath):
+        super().__init__()
+        self.file = open(filepath, mode='rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read_range(self, offset, size):
+        data = self.map[offset:offset + size]
+        self.requests += 1
+        self.bytes_read += len(data)
+        return data
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+# Reads through HTTP range requests, keeping the fetched segments in a small LRU cache. Planned
+# ranges are fetched in the background ahead of the reader, so transfers overlap decoding.
+class xed_http_source(xed_byte_source):
+    def __init__(self, url, block_size=XED_BLOCK_SIZE, cache_size=XED_CACHE_SIZE, readahead=XED_READAHEAD, timeout=30):
+        super().__init__()
+        self.url = url
+        self.block_size = block_size
+        self.cache_size = cache_size
+        self.readahead = readahead
+        self.timeout = timeout
+
+        # Cached segments by start offset, plus their sorted starts for lookups
+        self.segments = OrderedDict()
+        self.segment_starts = []
+        self.cached_bytes = 0
+
+        # Planned ranges, merged and sorted
+        self.planned = []
+        self.planned_starts = []
+
+        # Background fetches of planned ranges by start offset
+        self.executor = None
+        self.pending = {}
+        self.lock = threading.Lock()
+
+        # Whole file, kept when the server ignores range requests
+        self.full = None
+
+        self.size = self._fetch_size()
+
+    def _fetch_size(self):
+        request = urllib.request.Request(self.url, method="HEAD")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            self.requests += 1
+            length = response.headers.get("Content-Length")
+
+        if length is None:
+            raise Exception("ERROR: Remote file size unknown")
+
+        return int(length)
+
+    def _fetch(self, offset, size):
+        end = min(offset + size, self.size)
+        request = urllib.request.Request(self.url, headers={"Range": f"bytes={offset}-{end - 1}"})
+
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            data = response.read()
+            status = response.status
+
+        with self.lock:
+            self.requests += 1
+            self.bytes_read += len(data)
+
+        # Server ignored the range and sent the whole file, keep it so it is only downloaded once
+        if status == 200:
+            self.full = data
+            data = data[offset:end]
+        elif status != 206:
+            raise Exception(f"ERROR: Unexpected HTTP status {status}")
+
+        return data
+
+    def _cached(self, offset, size):
+        i = bisect.bisect_right(self.segment_starts, offset) - 1
+        if i < 0:
+            return None
+
+        start = self.segment_starts[i]
+        data = self.segments[start]
+        if offset + size > start + len(data):
+            return None
+
+        self.segments.move_to_end(start)
+        return data[offset - start:offset - start + size]
+
+    def _store(self, offset, data):
+        if offset in self.segments:
+            self.cached_bytes -= len(self.segments[offset])
+        else:
+            bisect.insort(self.segment_starts, offset)
+
+        self.segments[offset] = data
+        self.segments.move_to_end(offset)
+        self.cached_bytes += len(data)
+
+        # Evict least recently used segments, but always keep the newest one
+        while self.cached_bytes > self.cache_size and len(self.segments) > 1:
+            start, evicted = self.segments.popitem(last=False)
+            self.segment_starts.pop(bisect.bisect_left(self.segment_starts, start))
+            self.cached_bytes -= len(evicted)
+
+    def plan(self, ranges):
+        # The current range and the ones being prefetched must fit in the cache together
+        max_size = max(self.block_size, self.cache_size // (self.readahead + 1))
+        self.planned = xed_merge_ranges(ranges, XED_MAX_GAP, max_size)
+        self.planned_starts = [offset for offset, _ in self.planned]
+
+    def _planned_index(self, offset, size):
+        i = bisect.bisect_right(self.planned_starts, offset) - 1
+        if i >= 0 and offset + size <= self.planned[i][0] + self.planned[i][1]:
+            return i
+        return None
+
+    # Starts background fetches for the planned ranges from index first on
+    def _prefetch(self, first):
+        if self.readahead <= 0:
+            return
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.readahead)
+
+        for start, length in self.planned[first:first + self.readahead]:
+            if start not in self.pending and self._cached(start, length) is None:
+                self.pending[start] = self.executor.submit(self._fetch, start, length)
+
+    def read_range(self, offset, size):
+        if self.full is not None:
+            return self.full[offset:offset + size]
+
+        data = self._cached(offset, size)
+        if data is not None:
+            return data
+
+        i = self._planned_index(offset, size)
+        if i is not None:
+            start, length = self.planned[i]
+
+            # Drop prefetches the reader has already gone past
+            for stale in [s for s in self.pending if s < start]:
+                self.pending.pop(stale).cancel()
+
+            future = self.pending.pop(start, None)
+            data = future.result() if future is not None else self._fetch(start, length)
+
+            # Have the next planned ranges ready by the time the reader gets there
+            self._prefetch(i + 1)
+        else:
+            # Unplanned read, fetch at least a whole block
+            start = offset - offset % self.block_size
+            end = min(self.size, max(offset + size, start + self.block_size))
+            data = self._fetch(start, end - start)
+
+        self._store(start, data)
+        return data[offset - start:offset - start + size]
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+        self.pending = {}
+
+
+XED_SOURCES = {
+    "file": xed_file_source,
+    "mmap": xed_mmap_source,
+    "http": xed_http_source,
+}
+
+
+# Opens a byte source for the path, picking the backend from it when not given
+def xed_open_source(path, backend=None, **kwargs):
+    if backend is None:
+        backend = "http" if xed_is_url(path) else "file"
+
+    if backend not in XED_SOURCES:
+        raise Exception(f"ERROR: Unknown byte source backend {backend}")
+
+    return XED_SOURCES[backend](path, **kwargs)